@@ -118,6 +118,18 @@ a function of learning rate.
 Note: optimal learning rate depends on purpose and usage of filter (ammount
 of training, data characteristics, etc.).
 
+If you want to search over more parameters at once, use the function
+:code:`sweep`. It evaluates every combination of given parameters
+with a new filter, and it runs in parallel on all CPU cores if
+`joblib` is installed.
+
+.. code-block:: python
+
+    results = pa.filters.sweep("NLMS", {"mu": [0.1, 0.5, 1.], "eps": [0.001, 0.1]}, d, x)
+
+where :code:`results` is a dictionary with tuples of parameters as keys
+and :code:`(y, e, w, mse)` as values.
+
 
 Full Working Example
 ===================================================
@@ -179,6 +191,7 @@ from padasip.filters.sslms import FilterSSLMS
 from padasip.filters.vslms_ang import FilterVSLMS_Ang
 from padasip.filters.vslms_benveniste import FilterVSLMS_Benveniste
 from padasip.filters.vslms_mathews import FilterVSLMS_Mathews
+from padasip.filters.tuning import sweep
 
 
 def filter_data(d, x, model="lms", **kwargs):
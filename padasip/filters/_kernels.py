@@ -0,0 +1,133 @@
+"""
+Compiled adaptation loops for the adaptive filters.
+
+The kernels are compiled with Numba if it is installed. The compiled
+kernels are cached on disk, so the JIT compilation delay appears only
+at the first call after installation. If Numba is not installed,
+:code:`get_kernel` returns None and the filters fall back to the pure
+Python implementation from :code:`AdaptiveFilter.run`.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """
+        Dummy replacement of the Numba decorator.
+        """
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
+
+@njit(cache=True, fastmath=True)
+def predict_small(w, x):
+    """
+    Output of a filter - dot product of weights `w` and input `x`.
+    """
+    y = 0.0
+    for i in range(w.shape[0]):
+        y += w[i] * x[i]
+    return y
+
+
+@njit(cache=True, fastmath=True)
+def lms_run(w, x, d, mu, y0, record_weights):
+    """
+    Adaptation loop of the LMS filter. The weights `w` are updated in place.
+    The history of weights is empty if `record_weights` is False.
+
+    The argument `y0` is the output of the initial weights for all samples
+    (computed in one batch). The loop only corrects it with the accumulated
+    increments of the weights.
+    """
+    N, n = x.shape
+    y = np.zeros(N, dtype=x.dtype)
+    e = np.zeros(N, dtype=x.dtype)
+    dw = np.zeros(n, dtype=x.dtype)
+    w_history = np.zeros((N if record_weights else 0, n), dtype=x.dtype)
+    for k in range(N):
+        if record_weights:
+            for i in range(n):
+                w_history[k, i] = w[i] + dw[i]
+        y[k] = y0[k]
+        for i in range(n):
+            y[k] += x[k, i] * dw[i]
+        e[k] = d[k] - y[k]
+        for i in range(n):
+            dw[i] += mu * e[k] * x[k, i]
+    for i in range(n):
+        w[i] += dw[i]
+    return y, e, w_history
+
+
+@njit(cache=True, fastmath=True)
+def gngd_update(state, x, e, last_e, mu, eps, ro, eps_min):
+    """
+    One adaptation step of the GNGD filter. The `state` contains weights
+    in the first row and the last input in the second row. All the dot
+    products are computed in a single pass over the input and the state.
+    The state is updated in place, the adapted `eps` (not smaller
+    than `eps_min`) is returned.
+    """
+    n = state.shape[1]
+    s_xx = 0.0
+    s_xlx = 0.0
+    s_lxlx = 0.0
+    for i in range(n):
+        s_xx += x[i] * x[i]
+        s_xlx += x[i] * state[1, i]
+        s_lxlx += state[1, i] * state[1, i]
+    eps = eps - ro * mu * e * last_e * s_xlx / (s_lxlx + eps) ** 2
+    eps = max(eps, eps_min)
+    nu = mu / (eps + s_xx)
+    for i in range(n):
+        state[0, i] += nu * e * x[i]
+        state[1, i] = x[i]
+    return eps
+
+
+@njit(cache=True, fastmath=True)
+def gngd_run(state, x, d, mu, eps, ro, eps_min, last_e, record_weights):
+    """
+    Adaptation loop of the GNGD filter. The `state` (weights and the last
+    input) is updated in place, the adapted `eps` and the last error
+    are returned together with the outputs. The history of weights
+    is empty if `record_weights` is False.
+    """
+    N, n = x.shape
+    y = np.zeros(N, dtype=x.dtype)
+    e = np.zeros(N, dtype=x.dtype)
+    w_history = np.zeros((N if record_weights else 0, n), dtype=x.dtype)
+    for k in range(N):
+        if record_weights:
+            w_history[k, :] = state[0]
+        for i in range(n):
+            y[k] += state[0, i] * x[k, i]
+        e[k] = d[k] - y[k]
+        eps = gngd_update(state, x[k], e[k], last_e, mu, eps, ro, eps_min)
+        last_e = e[k]
+    return y, e, w_history, eps, last_e
+
+
+def get_kernel(name, dtype):
+    """
+    Return the compiled kernel of given name for given data type.
+
+    **Args:**
+
+    * `name` : name of the kernel (str)
+
+    * `dtype` : data type of the filter (numpy dtype)
+
+    **Returns:**
+
+    * Numba JIT kernel, or None if Numba is not installed.
+    """
+    if NUMBA_AVAILABLE:
+        return globals()[name]
+    return None
@@ -156,8 +156,17 @@ class FilterAP(AdaptiveFilterAP):
 
     def learning_rule(self, e_mem, x_mem):
         """
-        Override the parent class.
+        Override the parent class. For the memory of the filter
+        (`x_mem` is `self.x_mem`) the Gram matrix (or its inverse) updated
+        together with the memory is used. For any other input matrix
+        the Gram matrix is computed.
         """
-        dw_part1 = np.dot(x_mem.T, x_mem) + self.ide_ifc
-        dw_part2 = np.linalg.solve(dw_part1, self.ide)
-        return self.mu * np.dot(x_mem, np.dot(dw_part2, e_mem))
+        if x_mem is self.x_mem:
+            if self._x_mem_inv is not None:
+                z = np.dot(self._x_mem_inv, e_mem)
+            else:
+                np.add(self._x_mem_gram, self.ide_ifc, out=self._tmp_A)
+                z = np.linalg.solve(self._tmp_A, e_mem)
+        else:
+            z = np.linalg.solve(np.dot(x_mem.T, x_mem) + self.ide_ifc, e_mem)
+        return self.mu * np.dot(x_mem, z)
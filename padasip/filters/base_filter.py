@@ -5,13 +5,29 @@
 """
 import numpy as np
 
+from padasip.filters._kernels import get_kernel
+
+# the largest projection order of AP filter solved directly in every sample
+DIRECT_SOLVE_ORDER = 64
+
+
+def _zeros_aligned(shape, dtype=np.float64, order="C", alignment=64):
+    """
+    Create array of zeros with data aligned to given number of bytes.
+    """
+    dtype = np.dtype(dtype)
+    size = int(np.prod(shape)) * dtype.itemsize
+    buffer = np.zeros(size + alignment, dtype=np.uint8)
+    offset = -buffer.ctypes.data % alignment
+    return buffer[offset:offset + size].view(dtype).reshape(shape, order=order)
+
 
 class AdaptiveFilter():
     """
     Base class for adaptive filter classes. It puts together some functions
     used by all adaptive filters.
     """
-    def __init__(self, n, mu, w="random"):
+    def __init__(self, n, mu, w="random", dtype=np.float64, seed=None):
         """
         This class represents an generic adaptive filter.
 
@@ -34,9 +50,25 @@ class AdaptiveFilter():
             * "random" : create random weights
 
             * "zeros" : create zero value weights
+
+        * `dtype` : data type of weights and processed data. The default is
+          `np.float64`, `np.float32` can be used to reduce memory traffic
+          for long input streams. Other data types are not supported.
+
+        * `seed` : seed of the random generator used for random initial
+          weights (int). Every filter has its own generator, so the seed
+          of global numpy random generator has no effect on the filter.
         """
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError('The dtype must be np.float32 or np.float64.')
+        self._rng = np.random.default_rng(seed)
         self.w = self.init_weights(w, n)
         self.n = n
+        # compiled dot product is faster than np.dot for small filters
+        self._predict_small = None
+        if n <= 32:
+            self._predict_small = get_kernel("predict_small", self.dtype)
         self.w_history = False
         self.mu = mu
 
@@ -84,14 +116,17 @@ class AdaptiveFilter():
             n = self.n
         if isinstance(w, str):
             if w == "random":
-                w = np.random.normal(0, 0.5, n)
+                w = (self._rng.standard_normal(n) * 0.5).astype(self.dtype)
             elif w == "zeros":
-                w = np.zeros(n)
+                w = np.zeros(n, dtype=self.dtype)
             else:
                 raise ValueError('Impossible to understand the w')
-        elif len(w) == n:
+        elif isinstance(w, np.ndarray) and w.shape == (n,):
+            # always a copy - the weights are adapted in place
+            w = w.astype(self.dtype)
+        elif hasattr(w, "__len__") and len(w) == n:
             try:
-                w = np.array(w, dtype="float64")
+                w = np.array(w, dtype=self.dtype)
             except:
                 raise ValueError('Impossible to understand the w')
         else:
@@ -111,6 +146,9 @@ class AdaptiveFilter():
         * `y` : output value (float) calculated from input array.
 
         """
+        if self._predict_small is not None and isinstance(x, np.ndarray) \
+                and x.ndim == 1 and x.dtype == self.dtype:
+            return self._predict_small(self.w, x)
         return np.dot(self.w, x)
 
     def pretrained_run(self, d, x, ntrain=0.5, epochs=1):
@@ -146,7 +184,7 @@ class AdaptiveFilter():
         Ntrain = int(len(d)*ntrain)
         # train
         for _ in range(epochs):
-            self.run(d[:Ntrain], x[:Ntrain])
+            self.run(d[:Ntrain], x[:Ntrain], record_weights=False)
         # test
         y, e, w = self.run(d[Ntrain:], x[Ntrain:])
         return y, e, w
@@ -165,7 +203,7 @@ class AdaptiveFilter():
         e = d - y
         self.w += self.learning_rule(e, x)
 
-    def run(self, d, x):
+    def run(self, d, x, record_weights=True):
         """
         This function filters multiple samples in a row.
 
@@ -176,6 +214,11 @@ class AdaptiveFilter():
         * `x` : input matrix (2-dimensional array). Rows are samples,
           columns are input arrays.
 
+        **Kwargs:**
+
+        * `record_weights` : if False, the history of weights is not stored
+          and `None` is returned instead of it (bool), default value is True.
+
         **Returns:**
 
         * `y` : output value (1 dimensional array).
@@ -186,29 +229,55 @@ class AdaptiveFilter():
 
         * `w` : history of all weights (2 dimensional array).
           Every row is set of the weights for given sample.
+          It is `None` if `record_weights` is False.
         """
         # measure the data and check if the dimension agree
         N = len(x)
         if not len(d) == N:
             raise ValueError('The length of vector d and matrix x must agree.')
-        self.n = len(x[0])
-        # prepare data
+        # prepare data (no copy if they are already contiguous arrays)
         try:
-            x = np.array(x)
-            d = np.array(d)
+            x = np.ascontiguousarray(x, dtype=self.dtype)
+            d = np.ascontiguousarray(d, dtype=self.dtype)
         except:
             raise ValueError('Impossible to convert x or d to a numpy array')
+        if not x.ndim == 2 or not x.shape[1] == self.n:
+            raise ValueError('The size of input arrays must agree with filter size.')
+        y, e, w_history = self._run_loop(d, x, record_weights)
+        self.w_history = w_history if record_weights else None
+        return y, e, self.w_history
+
+    def _run_loop(self, d, x, record_weights=True):
+        """
+        Adaptation loop of the `run` function. It can be overridden
+        by a filter with a compiled kernel.
+
+        **Args:**
+
+        * `d` : desired value (1 dimensional array)
+
+        * `x` : input matrix (2-dimensional array)
+
+        * `record_weights` : store the history of weights (bool)
+
+        **Returns:**
+
+        * `y`, `e` and `w` as described in `run`.
+        """
+        N = len(x)
         # create empty arrays
-        y = np.zeros(N)
-        e = np.zeros(N)
-        self.w_history = np.zeros((N, self.n))
+        y = np.zeros(N, dtype=self.dtype)
+        e = np.zeros(N, dtype=self.dtype)
+        w_history = np.zeros((N if record_weights else 0, self.n),
+                             dtype=self.dtype)
         # adaptation loop
         for k in range(N):
-            self.w_history[k, :] = self.w
+            if record_weights:
+                w_history[k, :] = self.w
             y[k] = self.predict(x[k])
             e[k] = d[k] - y[k]
             self.w += self.learning_rule(e[k], x[k])
-        return y, e, self.w_history
+        return y, e, w_history
 
 
 class AdaptiveFilterAP(AdaptiveFilter):
@@ -229,12 +298,33 @@ class AdaptiveFilterAP(AdaptiveFilter):
         """
         super().__init__(*args, **kwargs)
         self.order = order
-        self.x_mem = np.zeros((self.n, self.order))
-        self.d_mem = np.zeros(order)
+        # Fortran order - columns (input arrays) are contiguous in memory
+        # and the transposed memory used in dot products is C-contiguous
+        self.x_mem = _zeros_aligned((self.n, self.order), dtype=self.dtype,
+                                    order="F")
+        self.d_mem = np.zeros(order, dtype=self.dtype)
+        self._head = 0
         self.ide_ifc = ifc * np.identity(self.order)
-        self.ide = np.identity(self.order)
-        self.y_mem = False
-        self.e_mem = False
+        # the Gram matrix and its inverse are always kept in double
+        # precision, the updates are sensitive to rounding errors
+        self._x_mem_gram = np.zeros((self.order, self.order))
+        # the inverse matrix is updated only for large projection orders,
+        # for small orders the direct solution is faster; if order is close
+        # to n (or larger) the Gram matrix is (nearly) singular and
+        # the updates of the inverse fall back to exact inversion too often
+        if DIRECT_SOLVE_ORDER < order and 2 * order <= self.n:
+            self._x_mem_inv = np.identity(self.order) / ifc
+        else:
+            self._x_mem_inv = None
+        self.y_mem = np.zeros(order, dtype=self.dtype)
+        self.e_mem = np.zeros(order, dtype=self.dtype)
+        # preallocated scratch arrays for the adaptation
+        self._tmp_A = np.empty((order, order))
+        self._tmp_b = np.empty(order, dtype=self.dtype)
+        if self._x_mem_inv is not None:
+            self._tmp_c = np.empty(order)
+            self._tmp_p = np.empty(order)
+            self._tmp_q = np.empty(order)
 
     def learning_rule(self, e_mem, x_mem):
         """
@@ -252,6 +342,80 @@ class AdaptiveFilterAP(AdaptiveFilter):
         """
         return np.zeros(len(x_mem))
 
+    def _update_memory(self, d, x):
+        """
+        Store new input array and desired value in the memory. The memory
+        is a circular buffer - the newest sample is stored in the column
+        (position) `self._head`, the older samples follow cyclically.
+        The ordering of the columns does not affect the adaptation.
+
+        The Gram matrix :math:`\\textbf{X}^{T} \\textbf{X}` is updated
+        together with the memory - only its row and column of the replaced
+        sample change. For large projection orders (at most `n` / 2)
+        also the inverse matrix
+        :math:`(\\textbf{X}^{T} \\textbf{X} + \\epsilon \\textbf{I})^{-1}`
+        is updated. This is a symmetric rank-2 change and the inverse
+        is updated with two Sherman-Morrison steps. The inverse is recomputed
+        exactly once per cycle of the buffer, and also whenever the downdate
+        would lose precision.
+
+        **Args:**
+
+        * `d` : desired value (float)
+
+        * `x` : input array (1-dimensional array)
+        """
+        self._head = (self._head - 1) % self.order
+        j = self._head
+        self.x_mem[:, j] = x
+        self.d_mem[j] = d
+        # new j-th row and column of the Gram matrix
+        gram_j = self._tmp_b
+        np.dot(self.x_mem.T, self.x_mem[:, j], out=gram_j)
+        if self._x_mem_inv is None:
+            self._x_mem_gram[j, :] = gram_j
+            self._x_mem_gram[:, j] = gram_j
+            return
+        # change of the j-th row and column for the update of the inverse
+        p, q = self._tmp_p, self._tmp_q
+        np.subtract(gram_j, self._x_mem_gram[j], out=p)
+        p[j] /= 2.
+        self._x_mem_gram[j, :] = gram_j
+        self._x_mem_gram[:, j] = gram_j
+        # exact inverse once per cycle of the buffer to avoid error drift
+        if j == 0:
+            self._invert_gram()
+            return
+        # a e_j^T + e_j a^T = p p^T - q q^T with p, q = (a/s +- s e_j)/sqrt(2),
+        # the scale s = sqrt(|a|) keeps both parts of similar size
+        scale = np.sqrt(max(np.sqrt(np.dot(p, p)), 1e-12))
+        p *= np.sqrt(0.5) / scale
+        q[:] = p
+        p[j] += np.sqrt(0.5) * scale
+        q[j] -= np.sqrt(0.5) * scale
+        # rank-1 update with p followed by rank-1 downdate with q
+        inv_v, outer = self._tmp_c, self._tmp_A
+        np.dot(self._x_mem_inv, p, out=inv_v)
+        np.outer(inv_v, inv_v, out=outer)
+        outer /= 1. + np.dot(p, inv_v)
+        self._x_mem_inv -= outer
+        np.dot(self._x_mem_inv, q, out=inv_v)
+        divisor = 1. - np.dot(q, inv_v)
+        # the downdate loses precision for divisor close to zero
+        if divisor < 0.1:
+            self._invert_gram()
+            return
+        np.outer(inv_v, inv_v, out=outer)
+        outer /= divisor
+        self._x_mem_inv += outer
+
+    def _invert_gram(self):
+        """
+        Compute exactly the inverse of regularized Gram matrix.
+        """
+        np.add(self._x_mem_gram, self.ide_ifc, out=self._tmp_A)
+        self._x_mem_inv = np.linalg.inv(self._tmp_A)
+
     def adapt(self, d, x):
         """
         Adapt weights according one desired value and its input.
@@ -263,20 +427,14 @@ class AdaptiveFilterAP(AdaptiveFilter):
         * `x` : input array (1-dimensional array)
         """
         # create input matrix and target vector
-        self.x_mem[:, 1:] = self.x_mem[:, :-1]
-        self.x_mem[:, 0] = x
-        self.d_mem[1:] = self.d_mem[:-1]
-        self.d_mem[0] = d
+        self._update_memory(d, x)
         # estimate output and error
-        self.y_mem = np.dot(self.x_mem.T, self.w)
-        self.e_mem = self.d_mem - self.y_mem
+        np.dot(self.x_mem.T, self.w, out=self.y_mem)
+        np.subtract(self.d_mem, self.y_mem, out=self.e_mem)
         # update
-        dw_part1 = np.dot(self.x_mem.T, self.x_mem) + self.ide_ifc
-        dw_part2 = np.linalg.solve(dw_part1, self.ide)
-        dw = np.dot(self.x_mem, np.dot(dw_part2, self.e_mem))
-        self.w += self.mu * dw
+        self.w += self.learning_rule(self.e_mem, self.x_mem)
 
-    def run(self, d, x):
+    def run(self, d, x, record_weights=True):
         """
         This function filters multiple samples in a row.
 
@@ -287,6 +445,11 @@ class AdaptiveFilterAP(AdaptiveFilter):
         * `x` : input matrix (2-dimensional array). Rows are samples,
           columns are input arrays.
 
+        **Kwargs:**
+
+        * `record_weights` : if False, the history of weights is not stored
+          and `None` is returned instead of it (bool), default value is True.
+
         **Returns:**
 
         * `y` : output value (1 dimensional array).
@@ -297,36 +460,39 @@ class AdaptiveFilterAP(AdaptiveFilter):
 
         * `w` : history of all weights (2 dimensional array).
           Every row is set of the weights for given sample.
+          It is `None` if `record_weights` is False.
 
         """
         # measure the data and check if the dimmension agree
         N = len(x)
         if not len(d) == N:
             raise ValueError('The length of vector d and matrix x must agree.')
-        self.n = len(x[0])
-        # prepare data
+        # prepare data (no copy if they are already contiguous arrays)
         try:
-            x = np.array(x)
-            d = np.array(d)
+            x = np.ascontiguousarray(x, dtype=self.dtype)
+            d = np.ascontiguousarray(d, dtype=self.dtype)
         except:
             raise ValueError('Impossible to convert x or d to a numpy array')
+        if not x.ndim == 2 or not x.shape[1] == self.n:
+            raise ValueError('The size of input arrays must agree with filter size.')
         # create empty arrays
-        y = np.zeros(N)
-        e = np.zeros(N)
-        self.w_history = np.zeros((N, self.n))
+        y = np.zeros(N, dtype=self.dtype)
+        e = np.zeros(N, dtype=self.dtype)
+        if record_weights:
+            self.w_history = np.zeros((N, self.n), dtype=self.dtype)
+        else:
+            self.w_history = None
         # adaptation loop
         for k in range(N):
-            self.w_history[k, :] = self.w
+            if record_weights:
+                self.w_history[k, :] = self.w
             # create input matrix and target vector
-            self.x_mem[:, 1:] = self.x_mem[:, :-1]
-            self.x_mem[:, 0] = x[k]
-            self.d_mem[1:] = self.d_mem[:-1]
-            self.d_mem[0] = d[k]
+            self._update_memory(d[k], x[k])
             # estimate output and error
-            self.y_mem = np.dot(self.x_mem.T, self.w)
-            self.e_mem = self.d_mem - self.y_mem
-            y[k] = self.y_mem[0]
-            e[k] = self.e_mem[0]
+            np.dot(self.x_mem.T, self.w, out=self.y_mem)
+            np.subtract(self.d_mem, self.y_mem, out=self.e_mem)
+            y[k] = self.y_mem[self._head]
+            e[k] = self.e_mem[self._head]
             # update
             self.w += self.learning_rule(self.e_mem, self.x_mem)
         return y, e, self.w_history
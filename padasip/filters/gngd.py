@@ -58,6 +58,7 @@ Code Explanation
 import numpy as np
 
 from padasip.filters.base_filter import AdaptiveFilter
+from padasip.filters._kernels import get_kernel
 
 class FilterGNGD(AdaptiveFilter):
     """
@@ -65,7 +66,7 @@ class FilterGNGD(AdaptiveFilter):
     """
     kind = "GNGD"
 
-    def __init__(self, n, mu=1., eps=1., ro=0.1, **kwargs):
+    def __init__(self, n, mu=1., eps=1., ro=0.1, eps_min=1e-12, **kwargs):
         """
         **Kwargs:**
 
@@ -75,12 +76,42 @@ class FilterGNGD(AdaptiveFilter):
         * `ro` : step size adaptation parameter (float) at the beginning.
           It is an adaptive parameter.
 
+        * `eps_min` : lower bound of the compensation term `eps` (float).
+          It prevents the division by zero or negative values.
+
         """
         super().__init__(n, mu, **kwargs)
         self.eps = eps
         self.ro = ro
+        self.eps_min = eps_min
         self.last_e = 0
-        self.last_x = np.zeros(n)
+        self.last_x = np.zeros(n, dtype=self.dtype)
+
+    @property
+    def w(self):
+        """
+        Adaptive weights - view of the first row of the filter state.
+        """
+        return self._state[0]
+
+    @w.setter
+    def w(self, w):
+        # weights and last input are stored together in one array,
+        # it is created with the initial weights in the parent class
+        if not hasattr(self, "_state"):
+            self._state = np.zeros((2, len(w)), dtype=self.dtype)
+        self._state[0] = w
+
+    @property
+    def last_x(self):
+        """
+        Last input array - view of the second row of the filter state.
+        """
+        return self._state[1]
+
+    @last_x.setter
+    def last_x(self, last_x):
+        self._state[1] = last_x
 
     def learning_rule(self, e, x):
         """
@@ -89,6 +120,37 @@ class FilterGNGD(AdaptiveFilter):
         self.eps = self.eps - self.ro * self.mu * e * self.last_e * \
                    np.dot(x, self.last_x) / \
                    (np.dot(self.last_x, self.last_x) + self.eps) ** 2
+        self.eps = max(self.eps, self.eps_min)
         nu = self.mu / (self.eps + np.dot(x, x))
         self.last_e, self.last_x = e, x
         return nu * e * x
+
+    def adapt(self, d, x):
+        """
+        Override the parent class with the compiled kernel if available.
+        """
+        gngd_update = get_kernel("gngd_update", self.dtype)
+        if gngd_update is None:
+            return super().adapt(d, x)
+        x = np.asarray(x, dtype=self.dtype)
+        e = d - self.predict(x)
+        scalar = self.dtype.type
+        self.eps = gngd_update(self._state, x, scalar(e), scalar(self.last_e),
+                               scalar(self.mu), scalar(self.eps),
+                               scalar(self.ro), scalar(self.eps_min))
+        self.last_e = e
+
+    def _run_loop(self, d, x, record_weights=True):
+        """
+        Override the parent class with the compiled kernel if available.
+        """
+        gngd_run = get_kernel("gngd_run", self.dtype)
+        if gngd_run is None:
+            return super()._run_loop(d, x, record_weights)
+        scalar = self.dtype.type
+        y, e, w_history, self.eps, self.last_e = gngd_run(
+            self._state, np.asarray(x, dtype=self.dtype),
+            np.asarray(d, dtype=self.dtype), scalar(self.mu), scalar(self.eps),
+            scalar(self.ro), scalar(self.eps_min), scalar(self.last_e),
+            record_weights)
+        return y, e, w_history
@@ -148,7 +148,10 @@ An example how to filter data measured in real-time
 Code Explanation
 ====================
 """
+import numpy as np
+
 from padasip.filters.base_filter import AdaptiveFilter
+from padasip.filters._kernels import get_kernel
 
 
 class FilterLMS(AdaptiveFilter):
@@ -162,3 +165,15 @@ class FilterLMS(AdaptiveFilter):
         Override the parent class.
         """
         return self.mu * x * e
+
+    def _run_loop(self, d, x, record_weights=True):
+        """
+        Override the parent class with the compiled kernel if available.
+        """
+        lms_run = get_kernel("lms_run", self.dtype)
+        if lms_run is None:
+            return super()._run_loop(d, x, record_weights)
+        x = np.asarray(x, dtype=self.dtype)
+        y0 = np.dot(x, self.w)
+        return lms_run(self.w, x, np.asarray(d, dtype=self.dtype),
+                       self.dtype.type(self.mu), y0, record_weights)
@@ -126,7 +126,7 @@ class FilterOCNLMS(AdaptiveFilter):
         Clear of data from memory and reset memory index.
         """
         self.mem_empty = True
-        self.mem_x = np.zeros((self.mem, self.n))
+        self.mem_x = np.zeros((self.mem, self.n), dtype=self.dtype)
         self.mem_d = np.zeros(self.mem)
         self.mem_idx = 0
 
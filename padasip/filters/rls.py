@@ -174,7 +174,7 @@ class FilterRLS(AdaptiveFilter):
         """
         super().__init__(n, mu, **kwargs)
         self.eps = eps
-        self.R = 1 / self.eps * np.identity(n)
+        self.R = 1 / self.eps * np.identity(n, dtype=self.dtype)
 
     def learning_rule(self, e, x):
         """
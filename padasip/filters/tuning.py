@@ -0,0 +1,95 @@
+"""
+.. versionadded:: 1.2.3
+
+Helper function for a parallel search over the setup (hyperparameters)
+of an adaptive filter. Every combination of parameters is evaluated
+with a fresh instance of the filter, so the combinations are independent
+and they are distributed over all available CPU cores with
+`joblib <https://joblib.readthedocs.io>`_. If joblib is not installed,
+the combinations are evaluated one by one.
+
+Example of the search over learning rate and size of NLMS filter
+
+.. code-block:: python
+
+    results = pa.filters.sweep("NLMS", {"mu": [0.1, 0.5, 1.], "n": [4]}, d, x)
+    best = min(results, key=lambda params: results[params][3])
+
+"""
+import itertools
+
+import numpy as np
+
+try:
+    import joblib
+except ImportError:
+    joblib = None
+
+
+def _fit_one(filter_cls, params, d, x):
+    """
+    Filter the data with a new filter created with given parameters.
+
+    **Returns:**
+
+    * `y`, `e`, final weights `w` and mean squared error `mse`.
+    """
+    filt = filter_cls(**params)
+    y, e, _ = filt.run(d, x, record_weights=False)
+    return y, e, filt.w, np.mean(e**2)
+
+
+def sweep(filter_cls, param_grid, d, x, n_jobs=-1):
+    """
+    Function that filters data with all combinations of parameters.
+
+    **Args:**
+
+    * `filter_cls` : class of the adaptive filter or its name (str).
+
+    * `param_grid` : dictionary of parameter names and lists of values
+      to try. The values must be hashable (e.g. initial weights given
+      as a tuple, not an array), because they are used as keys of the
+      results. If the filter size `n` is not in the grid, it is taken
+      from the shape of `x`.
+
+    * `d` : desired value (1 dimensional array)
+
+    * `x` : input matrix (2-dimensional array). Rows are samples, columns are
+      input arrays.
+
+    **Kwargs:**
+
+    * `n_jobs` : number of parallel jobs (int), default value is -1
+      (all CPU cores). It has no effect if joblib is not installed.
+
+    **Returns:**
+
+    * dictionary where keys are tuples of parameter values (in the order
+      of `param_grid` keys) and values are tuples `(y, e, w, mse)` with
+      output, error, final weights and mean squared error of the filter.
+    """
+    if isinstance(filter_cls, str):
+        from padasip.filters import get_filter
+        filter_cls = get_filter(filter_cls)
+    for name, values in param_grid.items():
+        for value in values:
+            try:
+                hash(value)
+            except TypeError:
+                msg = 'Values of parameter {} must be hashable, got {}'
+                raise ValueError(msg.format(name, type(value).__name__))
+    names = list(param_grid.keys())
+    combinations = list(itertools.product(*param_grid.values()))
+    configs = []
+    for values in combinations:
+        params = dict(zip(names, values))
+        params.setdefault("n", len(x[0]))
+        configs.append(params)
+    if joblib is None:
+        results = [_fit_one(filter_cls, params, d, x) for params in configs]
+    else:
+        results = joblib.Parallel(n_jobs=n_jobs, backend="loky")(
+            joblib.delayed(_fit_one)(filter_cls, params, d, x)
+            for params in configs)
+    return dict(zip(combinations, results))
@@ -89,8 +89,8 @@ class FilterVSLMS_Ang(AdaptiveFilter):
         self.ro = ro
         self.a = a
         self.last_e = 0
-        self.last_x = np.zeros(n)
-        self.last_fi = np.zeros(n)
+        self.last_x = np.zeros(n, dtype=self.dtype)
+        self.last_fi = np.zeros(n, dtype=self.dtype)
         self.last_mu = mu
 
     def learning_rule(self, e, x):
@@ -85,8 +85,8 @@ class FilterVSLMS_Benveniste(AdaptiveFilter):
         super().__init__(n, mu, **kwargs)
         self.ro = ro
         self.last_e = 0
-        self.last_x = np.zeros(n)
-        self.last_fi = np.zeros(n)
+        self.last_x = np.zeros(n, dtype=self.dtype)
+        self.last_fi = np.zeros(n, dtype=self.dtype)
         self.last_mu = mu
 
     def learning_rule(self, e, x):
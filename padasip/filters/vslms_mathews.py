@@ -85,7 +85,7 @@ class FilterVSLMS_Mathews(AdaptiveFilter):
         super().__init__(n, mu, **kwargs)
         self.ro = ro
         self.last_e = 0
-        self.last_x = np.zeros(n)
+        self.last_x = np.zeros(n, dtype=self.dtype)
         self.last_mu = mu
 
     def learning_rule(self, e, x):
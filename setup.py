@@ -24,6 +24,10 @@ setup(
     install_requires=[
         'numpy',
     ],
+    extras_require={
+        'numba': ['numba'],
+        'joblib': ['joblib'],
+    },
     bugtrack_url = "https://github.com/matousc89/padasip/issues",
     classifiers=[
         'Development Status :: 3 - Alpha',
@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 import sys
 import numpy as np
 
@@ -15,6 +16,40 @@ class TestFilters(unittest.TestCase):
         filt.adapt(1, x)
         self.assertAlmostEqual(filt.w.sum(), 9.0)
 
+    def test_base_filter_predict(self):
+        """
+        Test of the filter output for small and large filters.
+        """
+        np.random.seed(100)
+        get_kernel = pa.filters._kernels.get_kernel
+        for n in [4, 32, 33, 64]:
+            for dtype in [np.float64, np.float32]:
+                filt = pa.filters.FilterLMS(n, mu=1., dtype=dtype, seed=0)
+                # the compiled dot product exists only if numba is installed
+                compiled = get_kernel("predict_small", dtype) is not None
+                self.assertEqual(filt._predict_small is not None,
+                                 compiled and n <= 32)
+                x = np.random.normal(0, 1, n).astype(dtype)
+                self.assertAlmostEqual(filt.predict(x), np.dot(filt.w, x),
+                                       places=5)
+                # list input uses the fallback
+                self.assertAlmostEqual(filt.predict(list(x)),
+                                       np.dot(filt.w, x), places=5)
+
+    def test_base_filter_init_weights(self):
+        w = np.ones(3)
+        filt = pa.filters.FilterLMS(3, mu=1., w=w)
+        filt.adapt(1, np.array([2, 4, 3]))
+        self.assertEqual(w.sum(), 3.0)
+        self.assertRaises(ValueError, pa.filters.FilterLMS, 3, mu=1., w=1.)
+        self.assertRaises(ValueError, pa.filters.FilterLMS, 3, mu=1., w=w[:2])
+
+    def test_base_filter_run_size(self):
+        filt = pa.filters.FilterLMS(3, mu=1., w="zeros")
+        x = np.zeros((10, 4))
+        d = np.zeros(10)
+        self.assertRaises(ValueError, filt.run, d, x)
+
     def test_filter_gngd(self):
         """
         Test of GNGD filter output.
@@ -24,9 +59,134 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterGNGD(n=4, mu=0.9, w="random")
+        f = pa.filters.FilterGNGD(n=4, mu=0.9, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 16.622071160225627)
+        self.assertAlmostEqual(y.sum(), 12.416972922750956)
+
+    def test_filter_gngd_eps_min(self):
+        """
+        Test of the lower bound of GNGD compensation term.
+        """
+        np.random.seed(100)
+        N = 100
+        x = np.random.normal(0, 1, (N, 4))
+        d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3]
+        f = pa.filters.FilterGNGD(n=4, mu=1., eps=0.01, ro=10., eps_min=0.001)
+        for k in range(N):
+            f.adapt(d[k], x[k])
+            self.assertTrue(f.eps >= 0.001)
+
+    def test_get_kernel(self):
+        """
+        Test of the selection of compiled kernels.
+        """
+        kernels = pa.filters._kernels
+        float64, float32 = np.dtype("float64"), np.dtype("float32")
+        # JIT kernels with Numba
+        with mock.patch.object(kernels, "NUMBA_AVAILABLE", True):
+            self.assertIs(kernels.get_kernel("lms_run", float64),
+                          kernels.lms_run)
+            self.assertIs(kernels.get_kernel("lms_run", float32),
+                          kernels.lms_run)
+        # no kernels without Numba
+        with mock.patch.object(kernels, "NUMBA_AVAILABLE", False):
+            self.assertIsNone(kernels.get_kernel("lms_run", float64))
+            x = np.random.normal(0, 1, (10, 3))
+            f1 = pa.filters.FilterLMS(3, mu=0.1, w="zeros")
+            y1, e1, w1 = f1.run(x.sum(axis=1), x)
+        f2 = pa.filters.FilterLMS(3, mu=0.1, w="zeros")
+        y2, e2, w2 = f2.run(x.sum(axis=1), x)
+        self.assertTrue(np.allclose(y1, y2))
+
+    def test_filter_kernels(self):
+        """
+        Test that the compiled kernels agree with the Python loop.
+        """
+        np.random.seed(100)
+        N = 100
+        x = np.random.normal(0, 1, (N, 4))
+        v = np.random.normal(0, 0.1, N)
+        d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
+        for model in ["LMS", "GNGD"]:
+            f1 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros")
+            f2 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros")
+            y1, e1, w1 = f1.run(d, x)
+            y2, e2, w2 = pa.filters.base_filter.AdaptiveFilter._run_loop(
+                f2, d, x)
+            self.assertTrue(np.allclose(y1, y2))
+            self.assertTrue(np.allclose(w1, w2))
+        # sample-by-sample adaptation with the fused GNGD kernel
+        f1 = pa.filters.FilterGNGD(n=4, mu=0.1, w="zeros")
+        f2 = pa.filters.FilterGNGD(n=4, mu=0.1, w="zeros")
+        f1.run(d, x)
+        for k in range(N):
+            f2.adapt(d[k], x[k])
+        self.assertTrue(np.allclose(f1.w, f2.w))
+        self.assertAlmostEqual(f1.eps, f2.eps)
+
+    def test_filter_record_weights(self):
+        """
+        Test of filtering without the history of weights.
+        """
+        np.random.seed(100)
+        N = 100
+        x = np.random.normal(0, 1, (N, 4))
+        d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3]
+        for model in ["LMS", "NLMS", "AP"]:
+            f1 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros")
+            f2 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros")
+            y1, e1, w1 = f1.run(d, x)
+            y2, e2, w2 = f2.run(d, x, record_weights=False)
+            self.assertIsNone(w2)
+            self.assertTrue(np.allclose(y1, y2))
+            self.assertTrue(np.allclose(f1.w, f2.w))
+
+    def test_filter_dtype(self):
+        """
+        Test of filtering in single precision.
+        """
+        np.random.seed(100)
+        N = 100
+        x = np.random.normal(0, 1, (N, 4))
+        d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3]
+        for model in ["LMS", "GNGD", "AP"]:
+            f1 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros")
+            f2 = pa.filters.AdaptiveFilter(model=model, n=4, mu=0.1, w="zeros",
+                                           dtype=np.float32)
+            y1, e1, w1 = f1.run(d, x)
+            y2, e2, w2 = f2.run(d, x)
+            self.assertEqual(y2.dtype, np.float32)
+            self.assertEqual(f2.w.dtype, np.float32)
+            self.assertTrue(np.allclose(y1, y2, atol=1e-3))
+        for dtype in [np.int64, np.float16, np.complex128]:
+            with self.assertRaises(ValueError):
+                pa.filters.AdaptiveFilter(model="LMS", n=4, mu=0.1, dtype=dtype)
+            with self.assertRaises(ValueError):
+                pa.filters.FilterGNGD(n=4, mu=0.1, dtype=dtype)
+
+    def test_filter_sweep(self):
+        """
+        Test of the parameter sweep.
+        """
+        np.random.seed(100)
+        N = 100
+        x = np.random.normal(0, 1, (N, 4))
+        d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3]
+        grid = {"mu": [0.1, 0.5], "w": ["zeros"]}
+        results = pa.filters.sweep("NLMS", grid, d, x, n_jobs=2)
+        self.assertEqual(sorted(results.keys()), [(0.1, "zeros"), (0.5, "zeros")])
+        f = pa.filters.FilterNLMS(n=4, mu=0.5, w="zeros")
+        y, e, w = f.run(d, x)
+        self.assertTrue(np.allclose(results[(0.5, "zeros")][0], y))
+        self.assertAlmostEqual(results[(0.5, "zeros")][3], np.mean(e**2))
+        # unhashable values are rejected before filtering
+        with mock.patch.object(pa.filters.tuning, "_fit_one") as fit_one:
+            with self.assertRaises(ValueError):
+                pa.filters.sweep("NLMS", {"w": [np.zeros(4)]}, d, x)
+            fit_one.assert_not_called()
+        # the function does not shadow its module
+        import padasip.filters.tuning as tuning
+        self.assertIs(tuning.sweep, pa.filters.sweep)
 
     def test_filter_vslms_mathews(self):
         """
@@ -37,9 +197,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterVSLMS_Mathews(n=4, mu=0.1, ro=0.001, w="random")
+        f = pa.filters.FilterVSLMS_Mathews(n=4, mu=0.1, ro=0.001, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 18.46303593650432)
+        self.assertAlmostEqual(y.sum(), 14.721119410474193)
 
     def test_filter_vslms_benveniste(self):
         """
@@ -50,9 +210,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterVSLMS_Benveniste(n=4, mu=0.1, ro=0.0002, w="random")
+        f = pa.filters.FilterVSLMS_Benveniste(n=4, mu=0.1, ro=0.0002, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 18.048916937718058)
+        self.assertAlmostEqual(y.sum(), 13.234818638894726)
 
     def test_filter_vslms_ang(self):
         """
@@ -63,9 +223,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterVSLMS_Ang(n=4, mu=0.1, ro=0.0002, w="random")
+        f = pa.filters.FilterVSLMS_Ang(n=4, mu=0.1, ro=0.0002, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 18.341053442007972)
+        self.assertAlmostEqual(y.sum(), 13.695192376578198)
 
     def test_filter_ap(self):
         """
@@ -76,9 +236,81 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterAP(n=4, order=5, mu=0.5, ifc=0.001, w="random")
+        f = pa.filters.FilterAP(n=4, order=5, mu=0.5, ifc=0.001, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 15.105550229065491)
+        self.assertAlmostEqual(y.sum(), 12.7265431396101)
+
+    def test_filter_ap_inverse(self):
+        """
+        Test of the updated inverse matrix of AP filter.
+        """
+        np.random.seed(100)
+        N = 503
+        x = np.random.normal(0, 1, (N, 160))
+        d = x[:,0] - 2*x[:,1]
+        f = pa.filters.FilterAP(n=160, order=72, mu=0.5, ifc=1e-6, w="zeros")
+        for k in range(N):
+            f.adapt(d[k], x[k])
+        inv = np.linalg.inv(np.dot(f.x_mem.T, f.x_mem) + f.ide_ifc)
+        self.assertTrue(np.allclose(f._x_mem_inv, inv))
+
+    def test_filter_ap_reference(self):
+        """
+        Test of AP filter against direct solution in every sample.
+        """
+        def reference(d, x, order, mu, ifc):
+            n = x.shape[1]
+            w = np.zeros(n)
+            x_mem = np.zeros((n, order))
+            d_mem = np.zeros(order)
+            y = np.zeros(len(d))
+            for k in range(len(d)):
+                x_mem[:, 1:] = x_mem[:, :-1]
+                x_mem[:, 0] = x[k]
+                d_mem[1:] = d_mem[:-1]
+                d_mem[0] = d[k]
+                y_mem = np.dot(x_mem.T, w)
+                y[k] = y_mem[0]
+                A = np.dot(x_mem.T, x_mem) + ifc * np.identity(order)
+                w += mu * np.dot(x_mem, np.linalg.solve(A, d_mem - y_mem))
+            return y
+
+        np.random.seed(100)
+        for n, order, ifc, N in [(4, 8, 1e-5, 3000), (4, 20, 1e-6, 3000),
+                                 (160, 72, 1e-6, 500)]:
+            x = np.random.normal(0, 1, (N, n))
+            d = np.dot(x, np.random.normal(0, 1, n))
+            d += np.random.normal(0, 0.1, N)
+            f = pa.filters.FilterAP(n=n, order=order, mu=0.5, ifc=ifc,
+                                    w="zeros")
+            y, e, w = f.run(d, x, record_weights=False)
+            y_ref = reference(d, x, order, 0.5, ifc)
+            self.assertTrue(np.allclose(y, y_ref, atol=1e-6))
+
+    def test_filter_ap_learning_rule(self):
+        """
+        Test of AP learning rule with a matrix other than the filter memory.
+        """
+        np.random.seed(100)
+        f = pa.filters.FilterAP(n=4, order=5, mu=0.5, ifc=0.001, w="zeros")
+        x_mem = np.random.normal(0, 1, (4, 5))
+        e_mem = np.random.normal(0, 1, 5)
+        A = np.dot(x_mem.T, x_mem) + 0.001 * np.identity(5)
+        dw = 0.5 * np.dot(x_mem, np.linalg.solve(A, e_mem))
+        dw1 = f.learning_rule(e_mem, x_mem)
+        dw2 = f.learning_rule(2 * e_mem, x_mem)
+        self.assertTrue(np.allclose(dw1, dw))
+        self.assertTrue(np.allclose(dw2, 2 * dw))
+
+    def test_filter_ap_memory_layout(self):
+        """
+        Test of the layout of AP filter memory.
+        """
+        f = pa.filters.FilterAP(n=4, order=5, mu=0.5, w="zeros")
+        self.assertTrue(f.x_mem.flags.f_contiguous)
+        self.assertTrue(f.x_mem.T.flags.c_contiguous)
+        self.assertEqual(f.x_mem.ctypes.data % 64, 0)
+        self.assertEqual(f.x_mem.shape, (4, 5))
 
     def test_filter_lms(self):
         """
@@ -89,9 +321,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterLMS(n=4, mu=0.1, w="random")
+        f = pa.filters.FilterLMS(n=4, mu=0.1, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 18.199308184867885)
+        self.assertAlmostEqual(y.sum(), 14.45867816904404)
 
     def test_filter_nlms(self):
         """
@@ -102,9 +334,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterNLMS(n=4, mu=0.5, eps=0.01, w="random")
+        f = pa.filters.FilterNLMS(n=4, mu=0.5, eps=0.01, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 14.246570369497373)
+        self.assertAlmostEqual(y.sum(), 10.456228989724973)
 
     def test_filter_ocnlms(self):
         """
@@ -115,9 +347,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterOCNLMS(n=4, mu=1., mem=100, w="random")
+        f = pa.filters.FilterOCNLMS(n=4, mu=1., mem=100, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 13.775034155354426)
+        self.assertAlmostEqual(y.sum(), 10.748758527331164)
 
     def test_filter_Llncosh(self):
         np.random.seed(100)
@@ -125,9 +357,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterLlncosh(n=4, mu=1., lambd=3, w="random")
+        f = pa.filters.FilterLlncosh(n=4, mu=1., lambd=3, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 18.74164638623726)
+        self.assertAlmostEqual(y.sum(), -0.32412170656141015)
 
     def test_filter_rls(self):
         """
@@ -138,9 +370,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 4*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterRLS(n=4, mu=0.9, w="random")
+        f = pa.filters.FilterRLS(n=4, mu=0.9, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 16.80842884997325)
+        self.assertAlmostEqual(y.sum(), 14.846615155559109)
 
     def test_filter_LMF(self):
         """
@@ -151,9 +383,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 1*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterLMF(n=4, mu=0.01, w="random")
+        f = pa.filters.FilterLMF(n=4, mu=0.01, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 16.611322392961064)
+        self.assertAlmostEqual(y.sum(), 11.187104595607746)
 
     def test_filter_NLMF(self):
         """
@@ -164,9 +396,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 1*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterNLMF(n=4, mu=0.1, w="random")
+        f = pa.filters.FilterNLMF(n=4, mu=0.1, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 13.989262305958494)
+        self.assertAlmostEqual(y.sum(), 12.20964972168158)
 
     def test_filter_SSLMS(self):
         """
@@ -177,9 +409,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 1*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterSSLMS(n=4, mu=0.1, w="random")
+        f = pa.filters.FilterSSLMS(n=4, mu=0.1, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 12.579327704869938)
+        self.assertAlmostEqual(y.sum(), 16.831835434795178)
 
     def test_filter_NSSLMS(self):
         """
@@ -190,9 +422,9 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 1*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterNSSLMS(n=4, mu=0.3, eps=0.001, w="random")
+        f = pa.filters.FilterNSSLMS(n=4, mu=0.3, eps=0.001, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), -23.49342599164458)
+        self.assertAlmostEqual(y.sum(), 21.47804767423989)
 
     def test_filter_GMCC(self):
         """
@@ -203,6 +435,6 @@ class TestFilters(unittest.TestCase):
         x = np.random.normal(0, 1, (N, 4))
         v = np.random.normal(0, 0.1, N)
         d = 2*x[:,0] + 0.1*x[:,1] - 1*x[:,2] + 0.5*x[:,3] + v
-        f = pa.filters.FilterGMCC(n=4, mu=0.3, lambd=0.03, alpha=2, w="random")
+        f = pa.filters.FilterGMCC(n=4, mu=0.3, lambd=0.03, alpha=2, w="random", seed=0)
         y, e, w = f.run(d, x)
-        self.assertAlmostEqual(y.sum(), 7.002285017142926)
+        self.assertAlmostEqual(y.sum(), 3.7409128363193322)